@@ -0,0 +1,421 @@
+import argparse
+import itertools
+import multiprocessing
+import os
+import random
+import struct
+from collections import namedtuple
+from functools import lru_cache
+
+# Boards are stored as flat row-major lists, the same values a Tile's state takes
+MINE = 'mine'
+
+BoardMetrics = namedtuple('BoardMetrics', ['three_bv', 'openings', 'isolated_numbers'])
+
+
+def neighbor_indices(index, width, height):
+    """Helper to get the flat indices surrounding a cell (not including the cell itself)."""
+
+    y, x = divmod(index, width)
+    for ny in range(max(y-1, 0), min(y+2, height)):
+        for nx in range(max(x-1, 0), min(x+2, width)):
+            if nx != x or ny != y:
+                yield ny*width + nx
+
+
+@lru_cache(maxsize=None)
+def neighbor_table(width, height):
+    """The neighbours of every cell, worked out once per board size since the solver looks them up constantly."""
+
+    return tuple(tuple(neighbor_indices(i, width, height)) for i in range(width*height))
+
+
+def generate_layout(width, height, mines, clicked, rng=random):
+    """
+    Randomly place the mines and number every other cell.
+    No mine is placed on the clicked (x, y) cell or its neighbours, so the first click is always an opening.
+    """
+
+    x, y = clicked
+    safe = {y*width + x}
+    safe.update(neighbor_indices(y*width + x, width, height))
+    free_cells = [i for i in range(width*height) if i not in safe]
+
+    # If the board is too small for that many mines, place as many as fit
+    return number_layout(rng.sample(free_cells, min(mines, len(free_cells))), width, height)
+
+
+def number_layout(mine_cells, width, height):
+    """Build a layout from the flat indices of its mines."""
+
+    layout = [0] * (width*height)
+    for i in mine_cells:
+        layout[i] = MINE
+
+    # Every mine bumps the count of its neighbours instead of every cell counting its own
+    neighbors = neighbor_table(width, height)
+    for i in mine_cells:
+        for neighbor in neighbors[i]:
+            if layout[neighbor] != MINE:
+                layout[neighbor] += 1
+    return layout
+
+
+def board_metrics(layout, width, height):
+    """
+    3BV (the least clicks needed to clear the board), the number of openings and the number of isolated numbers.
+    This is done in one pass over the board: connected 0s are merged with a union-find, looking only at the
+    neighbours that have already been visited, and a number is isolated if none of its neighbours are 0.
+    """
+
+    neighbors = neighbor_table(width, height)
+    parent = {}
+
+    def find(i):
+        while parent[i] != i:
+            # Path halving keeps the trees flat
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    openings = 0
+    isolated_numbers = 0
+
+    for i, state in enumerate(layout):
+        if state == MINE:
+            continue
+
+        y, x = divmod(i, width)
+
+        if state == 0:
+            parent[i] = i
+            openings += 1
+
+            # Left, top left, top and top right have already been visited
+            for nx, ny in ((x-1, y), (x-1, y-1), (x, y-1), (x+1, y-1)):
+                if 0 <= nx < width and ny >= 0:
+                    neighbor = ny*width + nx
+                    if layout[neighbor] == 0:
+                        root, neighbor_root = find(i), find(neighbor)
+                        if root != neighbor_root:
+                            parent[root] = neighbor_root
+                            openings -= 1
+
+        elif not any(layout[neighbor] == 0 for neighbor in neighbors[i]):
+            isolated_numbers += 1
+
+    return BoardMetrics(openings + isolated_numbers, openings, isolated_numbers)
+
+
+def is_solvable(layout, width, height, clicked):
+    """
+    Whether the board can be cleared from the first click without ever having to guess.
+    Only the basic deductions are tried (a number that already has all its mines, a number whose hidden
+    neighbours must all be mines, and one number's neighbours being a subset of another's), so a board
+    that needs anything cleverer is treated as not solvable.
+    """
+
+    neighbors = neighbor_table(width, height)
+    revealed = [False] * (width*height)
+    flagged = [False] * (width*height)
+
+    def reveal(i):
+        to_visit = [i]
+        while len(to_visit) > 0:
+            visiting = to_visit.pop()
+            if revealed[visiting]:
+                continue
+            revealed[visiting] = True
+            if layout[visiting] == 0:
+                to_visit.extend(neighbors[visiting])
+
+    x, y = clicked
+    reveal(y*width + x)
+    safe_cells = sum(1 for state in layout if state != MINE)
+
+    progress = True
+    while progress:
+        progress = False
+
+        # Every revealed number still touching hidden cells, with those cells and how many mines are left in them
+        frontier = {}
+        for i, state in enumerate(layout):
+            if not revealed[i] or state == 0:
+                continue
+            hidden = set()
+            mines_left = state
+            for neighbor in neighbors[i]:
+                if flagged[neighbor]:
+                    mines_left -= 1
+                elif not revealed[neighbor]:
+                    hidden.add(neighbor)
+            if hidden:
+                frontier[i] = (hidden, mines_left)
+
+        for hidden, mines_left in frontier.values():
+            if mines_left == 0:
+                for cell in hidden:
+                    reveal(cell)
+                progress = True
+            elif mines_left == len(hidden):
+                for cell in hidden:
+                    flagged[cell] = True
+                progress = True
+        if progress:
+            continue
+
+        # Only numbers that share a hidden cell (so at most two cells apart) can say anything about each other
+        for i, (hidden, mines_left) in frontier.items():
+            y, x = divmod(i, width)
+            for other in (ny*width + nx for ny in range(y-2, y+3) for nx in range(x-2, x+3)
+                          if 0 <= nx < width and 0 <= ny < height):
+                if other == i or other not in frontier:
+                    continue
+                other_hidden, other_mines_left = frontier[other]
+                if not hidden < other_hidden:
+                    continue
+
+                difference = other_hidden - hidden
+                if other_mines_left == mines_left:
+                    for cell in difference:
+                        reveal(cell)
+                    progress = True
+                elif other_mines_left - mines_left == len(difference):
+                    for cell in difference:
+                        flagged[cell] = True
+                    progress = True
+
+    return sum(revealed) == safe_cells
+
+
+# Default location of the pre-generated boards
+bank_dir = "banks"
+
+# A bank starts with a header saying what kind of boards it has
+BANK_HEADER = struct.Struct('<4sHHH')
+BANK_MAGIC = b'MSBK'
+
+# Each board is its seed, first click, scores and then a bitmap of where the mines are
+# seed, click x, click y, 3BV, openings, solvable
+BANK_RECORD = struct.Struct('<IHHHHB')
+MAX_SEED = 2**32 - 1
+
+BankedBoard = namedtuple(
+    'BankedBoard', ['seed', 'clicked', 'three_bv', 'openings', 'is_solvable', 'mines', 'density', 'layout']
+)
+
+
+def bank_path(width, height, mines):
+    return os.path.join(bank_dir, f"{width}x{height}x{mines}.bank")
+
+
+def score_board(task):
+    """
+    Generate and score the board for one seed, packed ready to be written to a bank.
+    This runs in the worker processes, so the first click is derived from the seed as well.
+    """
+
+    seed, width, height, mines = task
+    rng = random.Random(seed)
+    clicked = (seed % width, (seed // width) % height)
+    layout = generate_layout(width, height, mines, clicked, rng)
+    metrics = board_metrics(layout, width, height)
+    solvable = is_solvable(layout, width, height, clicked)
+
+    bitmap = bytearray((width*height + 7) // 8)
+    for i, state in enumerate(layout):
+        if state == MINE:
+            bitmap[i // 8] |= 1 << (i % 8)
+
+    record = BANK_RECORD.pack(seed, clicked[0], clicked[1], metrics.three_bv, metrics.openings, solvable)
+    return record + bytes(bitmap), metrics, solvable
+
+
+def generate_bank(path, width, height, mines, count, seed=None, processes=None,
+                  min_3bv=None, max_3bv=None, solvable_only=False, batch_size=1024, max_rejected_batches=20):
+    """
+    Fill a bank with count boards that pass the filters, adding to it if it already exists.
+    Seeds are handed out in order, so the same seed and settings always produce the same bank.
+    Without a seed, generation carries on after the largest seed already in the bank (or starts at 0), and an
+    explicit seed has to be past it too, so the same board is never stored twice.
+    Gives up early if max_rejected_batches batches in a row had no board pass the filters, or the seeds run out.
+    """
+
+    header = BANK_HEADER.pack(BANK_MAGIC, width, height, mines)
+    record_size = BANK_RECORD.size + (width*height + 7) // 8
+    largest_seed = None
+    if os.path.isfile(path):
+        with open(path, 'r+b') as f:
+            if f.read(BANK_HEADER.size) != header:
+                raise ValueError(f"{path} holds boards of a different size")
+
+            # Drop a partially written board (e.g. from an interrupted run) so it can't shift the ones added after it
+            size = f.seek(0, os.SEEK_END)
+            f.truncate(size - (size - BANK_HEADER.size) % record_size)
+
+            f.seek(BANK_HEADER.size)
+            while True:
+                data = f.read(record_size)
+                if not data:
+                    break
+                stored_seed = BANK_RECORD.unpack_from(data)[0]
+                if largest_seed is None or stored_seed > largest_seed:
+                    largest_seed = stored_seed
+    else:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(header)
+
+    if seed is None:
+        seed = largest_seed + 1 if largest_seed is not None else 0
+    elif largest_seed is not None and seed <= largest_seed:
+        raise ValueError(f"{path} already has boards up to seed {largest_seed}, so the seed must be above it")
+    if not 0 <= seed <= MAX_SEED:
+        raise ValueError(f"seed must be between 0 and {MAX_SEED}")
+
+    seeds = iter(range(seed, MAX_SEED + 1))
+    accepted = 0
+    rejected_batches = 0
+    with multiprocessing.Pool(processes) as pool, open(path, 'ab') as f:
+        while accepted < count and rejected_batches < max_rejected_batches:
+            tasks = [(seed, width, height, mines) for seed in itertools.islice(seeds, batch_size)]
+            if not tasks:
+                break
+
+            accepted_before = accepted
+            for record, metrics, solvable in pool.imap(score_board, tasks, chunksize=64):
+                if min_3bv is not None and metrics.three_bv < min_3bv:
+                    continue
+                if max_3bv is not None and metrics.three_bv > max_3bv:
+                    continue
+                if solvable_only and not solvable:
+                    continue
+
+                f.write(record)
+                accepted += 1
+                if accepted == count:
+                    break
+
+            if accepted == accepted_before:
+                rejected_batches += 1
+            else:
+                rejected_batches = 0
+    return accepted
+
+
+class BoardBank:
+    """
+    Pre-generated boards grouped by their first click, so a matching board can be handed out instantly.
+    Boards are only used once per bank loaded.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.boards = {}
+
+        with open(path, 'rb') as f:
+            header = f.read(BANK_HEADER.size)
+            if len(header) < BANK_HEADER.size:
+                raise ValueError(f"{path} is not a board bank")
+            magic, self.width, self.height, self.mines = BANK_HEADER.unpack(header)
+            if magic != BANK_MAGIC:
+                raise ValueError(f"{path} is not a board bank")
+
+            bitmap_size = (self.width*self.height + 7) // 8
+            record_size = BANK_RECORD.size + bitmap_size
+            while True:
+                data = f.read(record_size)
+                if len(data) < record_size:
+                    break
+                seed, x, y, three_bv, openings, solvable = BANK_RECORD.unpack_from(data)
+                # Keep the raw bitmap around and only build the layout when the board is drawn
+                self.boards.setdefault((x, y), []).append(
+                    (seed, three_bv, openings, bool(solvable), data[BANK_RECORD.size:])
+                )
+
+    def __len__(self):
+        return sum(len(boards) for boards in self.boards.values())
+
+    def draw(self, clicked, solvable_only=False, rng=random):
+        """
+        Take a random board generated for this first click, or None if there are none left.
+        Picking at random means each launch of the game doesn't go through the boards in the same order.
+        """
+
+        candidates = self.boards.get(tuple(clicked), [])
+        matching = [
+            i for i, (_, _, _, solvable, _) in enumerate(candidates)
+            if solvable or not solvable_only
+        ]
+        if not matching:
+            return None
+
+        seed, three_bv, openings, solvable, bitmap = candidates.pop(rng.choice(matching))
+        mine_cells = [
+            cell for cell in range(self.width*self.height)
+            if bitmap[cell // 8] & (1 << (cell % 8))
+        ]
+        layout = number_layout(mine_cells, self.width, self.height)
+
+        # Worked out from the board itself, since a small board can end up with fewer mines than the header says
+        mines = len(mine_cells)
+        density = mines / (self.width*self.height)
+        return BankedBoard(seed, tuple(clicked), three_bv, openings, solvable, mines, density, layout)
+
+
+def open_bank(path, width, height, mines):
+    """
+    Load the bank at path if it has boards of this size, otherwise None.
+    A missing or damaged bank, or one of a different size, is ignored rather than stopping the game.
+    """
+
+    try:
+        bank = BoardBank(path)
+    except (OSError, ValueError):
+        return None
+
+    if (bank.width, bank.height, bank.mines) != (width, height, mines):
+        return None
+    return bank
+
+
+def parse_seed(text):
+    seed = int(text)
+    if not 0 <= seed <= MAX_SEED:
+        raise argparse.ArgumentTypeError(f"seed must be between 0 and {MAX_SEED}")
+    return seed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate scored minesweeper boards into a board bank.")
+    parser.add_argument('width', type=int)
+    parser.add_argument('height', type=int)
+    parser.add_argument('mines', type=int)
+    parser.add_argument('count', type=int, help="how many boards to add to the bank")
+    parser.add_argument('--seed', type=parse_seed, default=None,
+                        help="first seed to generate from (defaults to carrying on after the bank's boards)")
+    parser.add_argument('--processes', type=int, default=None, help="worker processes (defaults to the CPU count)")
+    parser.add_argument('--min-3bv', type=int, default=None)
+    parser.add_argument('--max-3bv', type=int, default=None)
+    parser.add_argument('--solvable-only', action='store_true', help="only keep boards that never need a guess")
+    parser.add_argument('--bank', default=None, help="path of the bank (defaults to banks/WxHxM.bank)")
+    args = parser.parse_args()
+
+    path = args.bank or bank_path(args.width, args.height, args.mines)
+    try:
+        accepted = generate_bank(
+            path, args.width, args.height, args.mines, args.count,
+            seed=args.seed,
+            processes=args.processes,
+            min_3bv=args.min_3bv,
+            max_3bv=args.max_3bv,
+            solvable_only=args.solvable_only,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"Added {accepted} boards to {path}")
+    if accepted < args.count:
+        print("Stopped early, the filters rejected too many boards in a row (or the seeds ran out)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+import argparse
+import bisect
+import os
+import struct
+import time
+from datetime import datetime
+
+games_path = "GAMES.log"
+index_path = "GAMES.idx"
+
+# Every game is stored as a fixed size record so the log can be streamed and seeked without parsing
+# timestamp, duration (ms), width, height, mines, won, clicks, 3BV
+RECORD = struct.Struct('<dIHHHBHH')
+
+# Largest values the record fields can hold, anything bigger gets clamped rather than failing to save
+MAX_DURATION = 2**32 - 1
+MAX_COUNT = 2**16 - 1
+
+# One index entry (timestamp, record number) is written every INDEX_STRIDE records
+INDEX_ENTRY = struct.Struct('<dQ')
+INDEX_STRIDE = 1024
+
+# How many records are read from the log at once while streaming
+CHUNK_RECORDS = 4096
+
+
+def append_game(duration, width, height, mines, won, clicks, three_bv, timestamp=None, path=None, idx_path=None):
+    """
+    Append a single finished game to the log.
+    The index only gets a new entry when a record starts a new block, so it stays tiny.
+    """
+
+    path = path or games_path
+    idx_path = idx_path or index_path
+    if timestamp is None:
+        timestamp = time.time()
+
+    record = RECORD.pack(
+        timestamp,
+        min(duration, MAX_DURATION),
+        min(width, MAX_COUNT),
+        min(height, MAX_COUNT),
+        min(mines, MAX_COUNT),
+        int(won),
+        min(clicks, MAX_COUNT),
+        min(three_bv, MAX_COUNT),
+    )
+
+    with open(path, 'ab') as f:
+        # Drop a partially written record (e.g. from a crash) so it can't shift every record after it
+        size = f.seek(0, os.SEEK_END)
+        size -= size % RECORD.size
+        f.truncate(size)
+
+        record_number = size // RECORD.size
+        f.write(record)
+
+    if record_number % INDEX_STRIDE == 0:
+        with open(idx_path, 'ab') as f:
+            # The index is written separately from the log, so it can be left with a partial entry too
+            size = f.seek(0, os.SEEK_END)
+            f.truncate(size - size % INDEX_ENTRY.size)
+            f.write(INDEX_ENTRY.pack(timestamp, record_number))
+
+
+def load_index(idx_path=None):
+    idx_path = idx_path or index_path
+    if not os.path.isfile(idx_path):
+        return [], []
+
+    with open(idx_path, 'rb') as f:
+        data = f.read()
+    # Ignore a partially written entry at the end
+    entries = list(INDEX_ENTRY.iter_unpack(data[:len(data) - len(data) % INDEX_ENTRY.size]))
+    timestamps = [timestamp for timestamp, _ in entries]
+    record_numbers = [record_number for _, record_number in entries]
+    return timestamps, record_numbers
+
+
+def iter_games(since=None, until=None, path=None, idx_path=None):
+    """
+    Stream the games between since and until (unix timestamps, both optional) as tuples in RECORD order.
+    Games are appended in time order, so the index tells us which block to start reading from.
+    """
+
+    path = path or games_path
+    if not os.path.isfile(path):
+        return
+
+    start = 0
+    if since is not None:
+        timestamps, record_numbers = load_index(idx_path)
+        block = bisect.bisect_right(timestamps, since) - 1
+        if block >= 0:
+            start = record_numbers[block]
+
+    with open(path, 'rb') as f:
+        f.seek(start * RECORD.size)
+        while True:
+            chunk = f.read(RECORD.size * CHUNK_RECORDS)
+            # A partially written record can only be at the end, since appending trims it off
+            chunk = chunk[:len(chunk) - (len(chunk) % RECORD.size)]
+            if not chunk:
+                return
+
+            for game in RECORD.iter_unpack(chunk):
+                timestamp = game[0]
+                if since is not None and timestamp < since:
+                    continue
+                if until is not None and timestamp >= until:
+                    return
+                yield game
+
+
+class GameAnalytics:
+    """
+    Running totals over a stream of games. Durations are kept as a histogram of 100ms buckets,
+    so memory depends on the spread of times and not on how many games were played.
+    """
+
+    bucket_ms = 100
+
+    def __init__(self):
+        self.games = 0
+        self.wins = 0
+        self.clicks = 0
+        self.win_duration_buckets = {}
+        self.win_duration_total = 0
+        self.win_3bv_total = 0
+
+    def add(self, game):
+        _, duration, _, _, _, won, clicks, three_bv = game
+        self.games += 1
+        self.clicks += clicks
+
+        # Only won games say anything meaningful about speed
+        if won:
+            self.wins += 1
+            bucket = duration // self.bucket_ms
+            self.win_duration_buckets[bucket] = self.win_duration_buckets.get(bucket, 0) + 1
+            self.win_duration_total += duration
+            self.win_3bv_total += three_bv
+
+    @property
+    def win_rate(self):
+        if self.games == 0:
+            return 0.0
+        return self.wins / self.games
+
+    @property
+    def three_bv_per_second(self):
+        if self.win_duration_total == 0:
+            return 0.0
+        return self.win_3bv_total / (self.win_duration_total / 1000)
+
+    def percentile(self, percent):
+        """Winning time (ms) below which the given percent of wins fall, accurate to bucket_ms."""
+
+        if self.wins == 0:
+            return None
+
+        target = self.wins * percent / 100
+        seen = 0
+        for bucket in sorted(self.win_duration_buckets):
+            seen += self.win_duration_buckets[bucket]
+            if seen >= target:
+                return (bucket + 1) * self.bucket_ms
+        return None
+
+    def report(self):
+        lines = [
+            f"Games Played: {self.games}",
+            f"Games Won: {self.wins}",
+            f"Win Rate: {self.win_rate:.2%}",
+        ]
+        if self.games:
+            lines.append(f"Clicks Per Game: {self.clicks / self.games:.1f}")
+        for percent in (50, 90, 99):
+            value = self.percentile(percent)
+            if value is not None:
+                lines.append(f"p{percent} Win Time: {value / 1000:.1f}s")
+        if self.wins:
+            lines.append(f"3BV/s: {self.three_bv_per_second:.3f}")
+        return "\n".join(lines)
+
+
+def analyse(since=None, until=None, path=None, idx_path=None):
+    analytics = GameAnalytics()
+    for game in iter_games(since, until, path, idx_path):
+        analytics.add(game)
+    return analytics
+
+
+def parse_date(text):
+    return datetime.strptime(text, "%Y-%m-%d").timestamp()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarise the recorded minesweeper games.")
+    parser.add_argument('--since', type=parse_date, help="first day to include (YYYY-MM-DD)")
+    parser.add_argument('--until', type=parse_date, help="day to stop at, exclusive (YYYY-MM-DD)")
+    parser.add_argument('--log', default=games_path, help="path of the game log")
+    parser.add_argument('--index', default=index_path, help="path of the game log index")
+    args = parser.parse_args()
+
+    print(analyse(args.since, args.until, args.log, args.index).report())
+
+if __name__ == '__main__':
+    main()
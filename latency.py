@@ -0,0 +1,115 @@
+"""
+Plays the game with synthetic clicks under pygame's dummy video and audio drivers, and reports how long each kind
+of click took to be displayed. Exits with an error if any action's p95 latency is over the budget, so it can be
+used to catch latency regressions.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+
+# These have to be set before pygame gets initialised by importing the game
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame as pg
+
+import history
+import minesweeper
+import tracing
+
+
+def click(app, pos, button):
+    """Press and release a mouse button over a position, one frame each like a real click."""
+
+    pg.event.post(pg.event.Event(pg.MOUSEBUTTONDOWN, pos=pos, button=button))
+    app.step()
+    pg.event.post(pg.event.Event(pg.MOUSEBUTTONUP, pos=pos, button=button))
+    app.step()
+
+
+def chord(app, pos):
+    """Hold left, press right and let go of both over a position."""
+
+    pg.event.post(pg.event.Event(pg.MOUSEBUTTONDOWN, pos=pos, button=1))
+    pg.event.post(pg.event.Event(pg.MOUSEBUTTONDOWN, pos=pos, button=3))
+    app.step()
+    pg.event.post(pg.event.Event(pg.MOUSEBUTTONUP, pos=pos, button=3))
+    pg.event.post(pg.event.Event(pg.MOUSEBUTTONUP, pos=pos, button=1))
+    app.step()
+
+
+def tile_pos(grid, tile):
+    x, y = tile.index
+    return (x*grid.tile_width + grid.tile_width//2, y*grid.tile_height + grid.tile_height//2)
+
+
+def play(app, clicks, rng):
+    """Click around the board at random until enough clicks were made, starting a new game whenever one ends."""
+
+    grid = app.grid
+    for _ in range(clicks):
+        if grid.is_game_over:
+            app.reset()
+
+        tiles = [tile for row in grid.grid for tile in row]
+        hidden = [tile for tile in tiles if not tile.is_revealed and not tile.is_flagged]
+        flagged = [tile for tile in tiles if tile.is_flagged]
+        numbers = [tile for tile in tiles if tile.is_revealed and isinstance(tile.state, int) and tile.state > 0]
+
+        roll = rng.random()
+        # Every hidden tile can end up flagged before the game is over, so take one of the flags back off
+        if not hidden:
+            click(app, tile_pos(grid, rng.choice(flagged)), 3)
+        elif numbers and roll < 0.1:
+            chord(app, tile_pos(grid, rng.choice(numbers)))
+        elif not grid.is_first_click and roll < 0.3:
+            click(app, tile_pos(grid, rng.choice(hidden)), 3)
+        else:
+            click(app, tile_pos(grid, rng.choice(hidden)), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure click to display latency with synthetic input.")
+    parser.add_argument('--clicks', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--budget', type=float, default=None, help="fail if any action's p95 is over this (ms)")
+    parser.add_argument('--fps', type=int, default=None,
+                        help="frame rate to run at (defaults to the game's, 0 runs frames back to back)")
+    args = parser.parse_args()
+
+    # The themes are loaded relative to the game, and nothing from this run should end up in the real stats
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    with tempfile.TemporaryDirectory() as output_dir:
+        minesweeper.stats_path = os.path.join(output_dir, "STATS.json")
+        history.games_path = os.path.join(output_dir, "GAMES.log")
+        history.index_path = os.path.join(output_dir, "GAMES.idx")
+
+        rng = random.Random(args.seed)
+        random.seed(args.seed)
+
+        # Banks are left out so boards only depend on the seed
+        tracer = tracing.Tracer()
+        app = minesweeper.create_app(tracer, use_bank=False)
+        # The clicks are posted just after a frame, so at the game's frame rate they wait about a whole frame to be read
+        if args.fps is not None:
+            app.fps = args.fps
+
+        play(app, args.clicks, rng)
+        pg.quit()
+
+    print(tracer.report())
+
+    if args.budget is not None:
+        slow = [
+            action for action, histogram in tracer.histograms.items()
+            if histogram.percentile(95) > args.budget
+        ]
+        if slow:
+            print(f"Over the {args.budget}ms budget: {', '.join(sorted(slow))}")
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,9 @@
 import json
 import os
 import pygame as pg
-import random
+import boards
+import history
+import tracing
 global screen
 
 pg.init()
@@ -40,7 +42,7 @@ def save_stats(stats):
     
 
 class Application:
-    def __init__(self, grid, sidebar):
+    def __init__(self, grid, sidebar, tracer=None):
         self.running = True
         self.clock = pg.time.Clock()
         self.fps = 60
@@ -51,14 +53,35 @@ class Application:
         self.selected_tile = None
         self.chording = False
 
+        # Mouse state is kept from the events themselves rather than asking pygame, so the state
+        # always matches the event being handled (and posted events behave like real ones)
+        self.mouse_pos = pg.mouse.get_pos()
+        self.buttons = [False, False, False]
+
         self.has_saved_stats = False
 
+        # Optional tracing of how long clicks take to show up on screen
+        self.tracer = tracer
+
     def event_loop(self):
-        for event in pg.event.get():
+        events = pg.event.get()
+        if self.tracer is not None:
+            self.tracer.poll()
+
+        for event in events:
             if event.type == pg.QUIT:
                 self.quit()
 
-            mouse_pos = pg.mouse.get_pos()
+            if event.type in (pg.MOUSEBUTTONDOWN, pg.MOUSEBUTTONUP, pg.MOUSEMOTION):
+                self.mouse_pos = event.pos
+
+            # Only the left, middle and right buttons matter (4 and up are the scroll wheel on some platforms)
+            if event.type in (pg.MOUSEBUTTONDOWN, pg.MOUSEBUTTONUP) and event.button <= 3:
+                self.buttons[event.button - 1] = event.type == pg.MOUSEBUTTONDOWN
+                if self.tracer is not None:
+                    self.tracer.receive(event.type)
+
+            mouse_pos = self.mouse_pos
 
             if self.grid.is_mouse_over_grid(mouse_pos):
                 self.handle_grid_events(event, mouse_pos)
@@ -74,11 +97,23 @@ class Application:
             # When to save the stats (it should be after a click and should happen once)
             if self.grid.is_game_over and not self.has_saved_stats:
                 save_stats(STATS)
+                self.record_game()
                 self.has_saved_stats = True
 
+    def record_game(self):
+        history.append_game(
+            duration=self.sidebar.timer,
+            width=self.grid.width,
+            height=self.grid.height,
+            mines=self.grid.mines,
+            won=self.grid.has_won,
+            clicks=self.grid.clicks,
+            three_bv=self.grid.three_bv,
+        )
+
     def handle_face_events(self, event, mouse_pos):
         x, y = mouse_pos
-        click = pg.mouse.get_pressed()
+        click = self.buttons
 
         if click[0]:
             self.sidebar.press_face()
@@ -92,8 +127,11 @@ class Application:
         
         if self.grid.is_game_over:
             return
+
+        if self.tracer is not None:
+            self.tracer.mark('handled')
         
-        click = pg.mouse.get_pressed()
+        click = self.buttons
 
         # If holding left click button
         if click[0]:
@@ -130,17 +168,31 @@ class Application:
                     
                 if event.button == 3:
                     self.selected_tile = self.grid.get_clicked_tile(x, y)
-                    self.grid.flag(self.selected_tile)
+                    # Only count clicks that actually do something
+                    if not self.selected_tile.is_revealed:
+                        self.grid.clicks += 1
+                        self.grid.flag(self.selected_tile)
+                        self.trace_action('flag')
             
         # Actions will take place upon release of the mouse button
         if event.type == pg.MOUSEBUTTONUP:
             if self.chording:
-                self.grid.chord_reveal(self.selected_tile)
+                # A chord without the right number of flags around it just lets go of the tiles
+                if self.grid.chord_reveal(self.selected_tile):
+                    self.grid.clicks += 1
+                    self.trace_action('chord')
                 self.chording = False
 
-            # Left click
+            # Left click (releasing left after a chord lands here too, but on a tile that is already revealed)
             elif event.button == 1 and self.selected_tile is not None:
-                self.grid.reveal_tile(self.selected_tile)
+                if not self.selected_tile.is_revealed and not self.selected_tile.is_flagged:
+                    self.grid.clicks += 1
+                    self.grid.reveal_tile(self.selected_tile)
+                    self.trace_action('reveal')
+
+    def trace_action(self, action):
+        if self.tracer is not None:
+            self.tracer.act(action)
         
     def update(self, dt):
         self.sidebar.display(dt)
@@ -156,13 +208,21 @@ class Application:
         self.update(dt)
         
         while self.running:
-            dt = self.clock.tick(self.fps)
-            self.event_loop()
-            self.update(dt)
-            pg.display.update()
+            self.step()
 
         pg.quit()
 
+    def step(self):
+        """Run a single frame."""
+
+        dt = self.clock.tick(self.fps)
+        self.event_loop()
+        self.update(dt)
+        pg.display.update()
+
+        if self.tracer is not None:
+            self.tracer.present()
+
     def quit(self):
         self.running = False
 
@@ -232,6 +292,8 @@ class SideBar:
         self.display_text(self.format_milliseconds(self.timer), 10)
         self.display_text("Mines Left:", 12)
         self.display_text(str(self.mines_left), 13)
+        self.display_text("3BV:", 15)
+        self.display_text(str(self.grid.three_bv), 16)
         self.timer_tick(dt)
         
     def display_text(self, txt, tile_y_pos, absolute_y_pos=None):
@@ -283,9 +345,10 @@ class SideBar:
 
 class Grid:
     
-    def __init__(self, width, height, tile_size, mines, theme):
+    def __init__(self, width, height, tile_size, mines, theme, bank=None):
         """
         Width and height are the number of tiles for the width and height.
+        If a board bank is given, boards are drawn from it before generating new ones.
         """
         
         self.width = width
@@ -302,9 +365,12 @@ class Grid:
         self.tile_height = tile_size[1]
         
         self.mines = mines
+        self.bank = bank
         self.grid = self.initiate_grid()
         self.sprite_mapping = self.load_sprites()
         self.flags_placed = 0
+        self.clicks = 0
+        self.metrics = None
 
         self.is_first_click = True
 
@@ -331,6 +397,19 @@ class Grid:
     def is_game_over(self):
         return self.has_won or self.has_lost
 
+    # The difficulty metrics are only known once the mines are generated after the first click
+    @property
+    def three_bv(self):
+        return self.metrics.three_bv if self.metrics is not None else 0
+
+    @property
+    def openings(self):
+        return self.metrics.openings if self.metrics is not None else 0
+
+    @property
+    def isolated_numbers(self):
+        return self.metrics.isolated_numbers if self.metrics is not None else 0
+
     def play_sfx(self, sfx):
         self.sfx_mapping[sfx].play()
 
@@ -341,6 +420,8 @@ class Grid:
         self.is_first_click = True
         self.grid = self.initiate_grid()
         self.flags_placed = 0
+        self.clicks = 0
+        self.metrics = None
         
     def is_mouse_over_grid(self, mouse_pos):
         mouse_x = mouse_pos[0]
@@ -392,31 +473,22 @@ class Grid:
 
         # Keep wherever people place flags before the first click
         flag_coords = self.get_flag_placement()
-        
-        # Randomly decide where the mines will go
-        free_tiles = [(x, y) for y in range(self.height) for x in range(self.width)]
 
-        # So that a mine never generates on the first click and on neighboring squares
-        x, y = clicked
-        for y_seek in range(-1, 2):
-            for x_seek in range(-1, 2):
-                nx, ny = x+x_seek, y+y_seek
-                if nx >= 0 and nx < self.width and ny >= 0 and ny < self.height:
-                    free_tiles.remove((nx, ny))
-            
-        random.shuffle(free_tiles)
-        mine_coords = free_tiles[:self.mines]
-        
+        # Use a pre-generated board for this first click if there is one
+        banked = self.bank.draw(clicked) if self.bank is not None else None
+        if banked is not None:
+            layout = banked.layout
+        else:
+            # So that a mine never generates on the first click and on neighboring squares
+            layout = boards.generate_layout(self.width, self.height, self.mines, clicked)
+
         for y in range(self.height):
             for x in range(self.width):
-                if (x, y) in mine_coords:
-                    state = 'mine'
-                else:
-                    state = 0
+                state = layout[y*self.width + x]
                 is_flagged = (x, y) in flag_coords
                 self.grid[y][x] = Tile(self.tile_size, (x, y), state, is_flagged=is_flagged)
 
-        self.grid = self.enumerate_tiles(self.grid)
+        self.metrics = boards.board_metrics(layout, self.width, self.height)
         return self.grid
 
     def get_flag_placement(self):
@@ -427,20 +499,6 @@ class Grid:
                     coords.append((x, y))
         return coords
                     
-    def enumerate_tiles(self, grid):
-        width, height = len(grid[0]), len(grid)
-        
-        for y in range(height):
-            for x in range(width):
-                if grid[y][x].state != 'mine':
-                    # Count how many mines surround the tile
-                    count = 0
-                    for neighbor in self.get_tile_neighbors(grid[y][x]):
-                        if neighbor.state == 'mine':
-                            count += 1
-                    grid[y][x].state = count
-        return grid
-        
     def get_tile_neighbors(self, tile):
         """Helper to function to get an iterable of a tile's neigbours."""
         
@@ -474,6 +532,9 @@ class Grid:
                 neighbor.release()
 
     def chord_reveal(self, tile):
+        """Returns whether chording revealed any tiles."""
+
+        revealed = False
         flags = 0
         for neighbor in self.get_tile_neighbors(tile):
             if neighbor.is_flagged:
@@ -483,11 +544,14 @@ class Grid:
             for neighbor in self.get_tile_neighbors(tile):
                 if not neighbor.is_revealed:
                     neighbor.release()
+                    if not neighbor.is_flagged:
+                        revealed = True
                     self.reveal_tile(neighbor)
             STATS["Times Chorded"] += 1
             
         else:
             self.unchord(tile)
+        return revealed
             
     def flag(self, tile):
         x, y = tile.index
@@ -663,7 +727,7 @@ class Tile:
         self.is_held_down = False
 
 
-def main():
+def create_app(tracer=None, use_bank=True):
     tile_length = 30
 
     # These numbers are given in terms of how many tiles can fit across each length
@@ -715,13 +779,19 @@ def main():
     }
             
     theme = "classic"
+    mines = 70
+
+    # Boards pre-generated with boards.py get used when there are some for this size
+    path = boards.bank_path(grid_width, grid_height, mines)
+    bank = boards.open_bank(path, grid_width, grid_height, mines) if use_bank else None
         
     grid = Grid(
         grid_width,
         grid_height,
         (tile_length, tile_length),
-        mines=70,
+        mines=mines,
         theme=THEMES[theme],
+        bank=bank,
     )
 
     sidebar = SideBar(
@@ -740,10 +810,18 @@ def main():
     global STATS
     STATS = get_stats()
     
-    
-        
-    app = Application(grid, sidebar)
+    return Application(grid, sidebar, tracer=tracer)
+
+
+def main():
+    # Set MINESWEEPER_TRACE to see how long clicks took to be displayed once the game is closed
+    tracer = tracing.Tracer() if os.environ.get('MINESWEEPER_TRACE') else None
+
+    app = create_app(tracer)
     app.run()
 
+    if tracer is not None:
+        print(tracer.report())
+
 if __name__ == '__main__':
     main()
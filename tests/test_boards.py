@@ -0,0 +1,183 @@
+import random
+
+import pytest
+
+import boards
+from boards import MINE
+
+
+def flood_fill_3bv(layout, width, height):
+    """3BV the slow and obvious way, clicking every opening and then every number that is left."""
+
+    cleared = set()
+    clicks = 0
+    for i, state in enumerate(layout):
+        if state != 0 or i in cleared:
+            continue
+        clicks += 1
+        to_visit = [i]
+        while to_visit:
+            cell = to_visit.pop()
+            if cell in cleared:
+                continue
+            cleared.add(cell)
+            if layout[cell] == 0:
+                to_visit.extend(boards.neighbor_indices(cell, width, height))
+    return clicks + sum(1 for i, state in enumerate(layout) if state != MINE and i not in cleared)
+
+
+def test_generate_layout_keeps_first_click_safe():
+    rng = random.Random(1)
+    for _ in range(200):
+        width, height = rng.randint(3, 20), rng.randint(3, 20)
+        mines = rng.randint(0, width*height - 9)
+        clicked = (rng.randrange(width), rng.randrange(height))
+        layout = boards.generate_layout(width, height, mines, clicked, rng)
+
+        assert layout.count(MINE) == mines
+        x, y = clicked
+        assert layout[y*width + x] == 0
+
+
+def test_generate_layout_with_too_many_mines_places_what_fits():
+    layout = boards.generate_layout(3, 3, 1, (1, 1))
+    assert layout == [0] * 9
+
+    layout = boards.generate_layout(4, 4, 100, (0, 0))
+    assert layout.count(MINE) == 12
+
+
+def test_metrics_of_hand_built_layouts():
+    # Two openings split by a column of mines, numbers all touching an opening
+    layout = [
+        0, 2, MINE, 2, 0,
+        0, 3, MINE, 3, 0,
+        0, 2, MINE, 2, 0,
+    ]
+    assert boards.board_metrics(layout, 5, 3) == (2, 2, 0)
+
+    # No openings at all, so every number is its own click
+    layout = [
+        1, MINE, 1,
+        MINE, 2, 1,
+    ]
+    assert boards.board_metrics(layout, 3, 2) == (4, 0, 4)
+
+    # A mine in the corner of a 3x3 leaves one opening wrapping round it
+    layout = boards.number_layout([0], 3, 3)
+    assert layout == [MINE, 1, 0, 1, 1, 0, 0, 0, 0]
+    assert boards.board_metrics(layout, 3, 3) == (1, 1, 0)
+
+    # The 2 is trapped between mines, the 1 is on the edge of the opening
+    layout = boards.number_layout([0, 2], 6, 1)
+    assert layout == [MINE, 2, MINE, 1, 0, 0]
+    assert boards.board_metrics(layout, 6, 1) == (2, 1, 1)
+
+
+def test_3bv_matches_flood_fill():
+    rng = random.Random(2)
+    for _ in range(500):
+        width, height = rng.randint(3, 25), rng.randint(3, 25)
+        mines = rng.randint(0, width*height - 9)
+        clicked = (rng.randrange(width), rng.randrange(height))
+        layout = boards.generate_layout(width, height, mines, clicked, rng)
+
+        metrics = boards.board_metrics(layout, width, height)
+        assert metrics.three_bv == flood_fill_3bv(layout, width, height)
+        assert metrics.three_bv == metrics.openings + metrics.isolated_numbers
+
+
+def test_solver_clears_an_open_board():
+    layout = boards.number_layout([24], 5, 5)
+    assert boards.is_solvable(layout, 5, 5, (0, 0))
+
+
+def test_solver_needs_the_subset_rule():
+    # No single number settles anything around the bottom mines, but the 1 in the bottom right
+    # only touches cells that the 2 above it also touches
+    layout = boards.number_layout([9, 11, 13], 5, 4)
+    assert layout == [
+        0, 0, 0, 1, 1,
+        1, 1, 2, 2, MINE,
+        1, MINE, 2, MINE, 2,
+        1, 1, 2, 1, 1,
+    ]
+    assert boards.is_solvable(layout, 5, 4, (0, 0))
+
+
+def test_solver_refuses_to_guess():
+    # The mine is in one of the two right hand cells and both numbers touch both of them
+    layout = boards.number_layout([4], 5, 2)
+    assert not boards.is_solvable(layout, 5, 2, (0, 0))
+
+
+def test_bank_round_trip(tmp_path):
+    path = str(tmp_path / "9x9x10.bank")
+    assert boards.generate_bank(path, 9, 9, 10, 20, processes=1, batch_size=16) == 20
+
+    # An interrupted run leaves part of a board behind, which must not shift the boards added next
+    with open(path, 'ab') as f:
+        f.write(b'\x01\x02\x03')
+    assert boards.generate_bank(path, 9, 9, 10, 5, seed=1000, processes=1, batch_size=16) == 5
+
+    bank = boards.BoardBank(path)
+    assert len(bank) == 25
+    for clicked, banked in bank.boards.items():
+        for seed, three_bv, openings, solvable, bitmap in banked:
+            assert seed < 20 or seed >= 1000
+
+    clicked = next(iter(bank.boards))
+    available = len(bank.boards[clicked])
+    board = bank.draw(clicked)
+    assert len(bank.boards[clicked]) == available - 1
+    x, y = clicked
+    assert board.layout[y*9 + x] == 0
+    assert board.layout.count(MINE) == board.mines == 10
+    assert board.density == 10 / 81
+    assert boards.board_metrics(board.layout, 9, 9)[:2] == (board.three_bv, board.openings)
+    assert boards.is_solvable(board.layout, 9, 9, clicked) == board.is_solvable
+
+
+def test_adding_to_a_bank_carries_on_after_its_seeds(tmp_path):
+    path = str(tmp_path / "9x9x10.bank")
+    boards.generate_bank(path, 9, 9, 10, 10, processes=1, batch_size=16)
+    boards.generate_bank(path, 9, 9, 10, 10, processes=1, batch_size=16)
+
+    bank = boards.BoardBank(path)
+    seeds = [board[0] for banked in bank.boards.values() for board in banked]
+    assert sorted(seeds) == list(range(20))
+
+    with pytest.raises(ValueError):
+        boards.generate_bank(path, 9, 9, 10, 10, seed=5, processes=1, batch_size=16)
+
+
+def test_bank_gives_up_when_nothing_passes(tmp_path):
+    path = str(tmp_path / "9x9x10.bank")
+    accepted = boards.generate_bank(path, 9, 9, 10, 5, processes=1, min_3bv=1000, batch_size=8, max_rejected_batches=3)
+    assert accepted == 0
+
+
+def test_banked_density_counts_the_mines_actually_placed(tmp_path):
+    # The first board's first click is in the corner, which leaves room for only 12 of the 14 mines
+    path = str(tmp_path / "4x4x14.bank")
+    boards.generate_bank(path, 4, 4, 14, 1, processes=1, batch_size=1)
+
+    bank = boards.BoardBank(path)
+    board = bank.draw(next(iter(bank.boards)))
+    assert board.mines == board.layout.count(MINE) == 12
+    assert board.density == 12 / 16
+
+
+def test_open_bank_ignores_unusable_banks(tmp_path):
+    path = str(tmp_path / "20x20x70.bank")
+    assert boards.open_bank(path, 20, 20, 70) is None
+
+    # A bank of a different size saved under this size's name
+    boards.generate_bank(path, 9, 9, 10, 3, processes=1, batch_size=8)
+    assert boards.open_bank(path, 20, 20, 70) is None
+    assert len(boards.open_bank(path, 9, 9, 10)) == 3
+
+    for data in (b'MS', b'JUNKJUNKJUNK'):
+        with open(path, 'wb') as f:
+            f.write(data)
+        assert boards.open_bank(path, 9, 9, 10) is None
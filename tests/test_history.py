@@ -0,0 +1,81 @@
+import history
+
+
+def paths(tmp_path):
+    return str(tmp_path / "GAMES.log"), str(tmp_path / "GAMES.idx")
+
+
+def test_append_and_read_back(tmp_path):
+    path, idx_path = paths(tmp_path)
+    history.append_game(12345, 20, 20, 70, True, 40, 110, timestamp=100.0, path=path, idx_path=idx_path)
+    history.append_game(500, 9, 9, 10, False, 3, 12, timestamp=200.0, path=path, idx_path=idx_path)
+
+    games = list(history.iter_games(path=path, idx_path=idx_path))
+    assert games == [
+        (100.0, 12345, 20, 20, 70, 1, 40, 110),
+        (200.0, 500, 9, 9, 10, 0, 3, 12),
+    ]
+
+
+def test_since_and_until_use_the_index(tmp_path):
+    path, idx_path = paths(tmp_path)
+    count = history.INDEX_STRIDE * 3 + 5
+    for i in range(count):
+        history.append_game(1000, 9, 9, 10, i % 2 == 0, 5, 10, timestamp=float(i), path=path, idx_path=idx_path)
+
+    timestamps, record_numbers = history.load_index(idx_path)
+    assert record_numbers == [0, history.INDEX_STRIDE, history.INDEX_STRIDE * 2, history.INDEX_STRIDE * 3]
+    assert timestamps == [float(n) for n in record_numbers]
+
+    since = history.INDEX_STRIDE * 2 + 10
+    until = history.INDEX_STRIDE * 3 + 2
+    games = list(history.iter_games(since=since, until=until, path=path, idx_path=idx_path))
+    assert [game[0] for game in games] == [float(i) for i in range(since, until)]
+
+
+def test_partial_record_is_dropped_before_appending(tmp_path):
+    path, idx_path = paths(tmp_path)
+    history.append_game(1000, 9, 9, 10, True, 5, 10, timestamp=1.0, path=path, idx_path=idx_path)
+    with open(path, 'ab') as f:
+        f.write(b'\x00\x01')
+    history.append_game(2000, 16, 16, 40, False, 8, 30, timestamp=2.0, path=path, idx_path=idx_path)
+
+    games = list(history.iter_games(path=path, idx_path=idx_path))
+    assert games == [
+        (1.0, 1000, 9, 9, 10, 1, 5, 10),
+        (2.0, 2000, 16, 16, 40, 0, 8, 30),
+    ]
+
+
+def test_partial_index_entry_is_ignored_and_dropped(tmp_path):
+    path, idx_path = paths(tmp_path)
+    for i in range(history.INDEX_STRIDE):
+        history.append_game(1000, 9, 9, 10, True, 5, 10, timestamp=float(i), path=path, idx_path=idx_path)
+    with open(idx_path, 'ab') as f:
+        f.write(b'\x00\x01\x02')
+
+    assert history.load_index(idx_path) == ([0.0], [0])
+    games = list(history.iter_games(since=5.0, path=path, idx_path=idx_path))
+    assert len(games) == history.INDEX_STRIDE - 5
+
+    history.append_game(1000, 9, 9, 10, True, 5, 10, timestamp=float(history.INDEX_STRIDE), path=path, idx_path=idx_path)
+    assert history.load_index(idx_path) == ([0.0, float(history.INDEX_STRIDE)], [0, history.INDEX_STRIDE])
+
+
+def test_values_too_big_for_a_record_are_clamped(tmp_path):
+    path, idx_path = paths(tmp_path)
+    history.append_game(2**40, 9, 9, 10, True, 100000, 70000, timestamp=1.0, path=path, idx_path=idx_path)
+
+    game, = history.iter_games(path=path, idx_path=idx_path)
+    assert game == (1.0, history.MAX_DURATION, 9, 9, 10, 1, history.MAX_COUNT, history.MAX_COUNT)
+
+
+def test_analytics():
+    analytics = history.GameAnalytics()
+    for duration, won in ((10000, True), (20000, True), (5000, False), (40000, True)):
+        analytics.add((0.0, duration, 9, 9, 10, won, 10, 35))
+
+    assert analytics.games == 4
+    assert analytics.win_rate == 0.75
+    assert analytics.percentile(50) == 20100
+    assert analytics.three_bv_per_second == 35 * 3 / 70
@@ -0,0 +1,84 @@
+import os
+import random
+
+# pygame gets initialised as soon as the game is imported, so the dummy drivers have to be picked first
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame as pg
+import pytest
+
+import history
+import latency
+import minesweeper
+import tracing
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    # The themes are loaded relative to the game, and nothing from the tests should end up in the real stats
+    monkeypatch.chdir(REPO_DIR)
+    monkeypatch.setattr(minesweeper, 'stats_path', str(tmp_path / "STATS.json"))
+    monkeypatch.setattr(history, 'games_path', str(tmp_path / "GAMES.log"))
+    monkeypatch.setattr(history, 'index_path', str(tmp_path / "GAMES.idx"))
+    random.seed(0)
+
+    app = minesweeper.create_app(tracing.Tracer(), use_bank=False)
+    app.fps = 0
+    yield app
+    pg.quit()
+
+
+def test_synthetic_clicks_drive_the_game(app):
+    grid = app.grid
+    first = grid.grid[10][10]
+
+    # Holding the left button down presses the tile without revealing it
+    pg.event.post(pg.event.Event(pg.MOUSEBUTTONDOWN, pos=latency.tile_pos(grid, first), button=1))
+    app.step()
+    assert grid.is_holding
+    assert first.is_held_down and not first.is_revealed
+
+    pg.event.post(pg.event.Event(pg.MOUSEBUTTONUP, pos=latency.tile_pos(grid, first), button=1))
+    app.step()
+    first = grid.grid[10][10]
+    assert not grid.is_first_click
+    assert first.is_revealed and first.state == 0
+    assert grid.clicks == 1
+
+    # A number on the edge of the opening, with the mines around it flagged so it can be chorded
+    tiles = [tile for row in grid.grid for tile in row]
+    number = next(
+        tile for tile in tiles
+        if tile.is_revealed and isinstance(tile.state, int) and tile.state > 0
+        and any(not neighbor.is_revealed and neighbor.state != 'mine' for neighbor in grid.get_tile_neighbors(tile))
+    )
+    mines = [neighbor for neighbor in grid.get_tile_neighbors(number) if neighbor.state == 'mine']
+    for mine in mines:
+        latency.click(app, latency.tile_pos(grid, mine), 3)
+    assert all(mine.is_flagged for mine in mines)
+    assert grid.flags_placed == len(mines)
+
+    latency.chord(app, latency.tile_pos(grid, number))
+    assert all(neighbor.is_revealed or neighbor.is_flagged for neighbor in grid.get_tile_neighbors(number))
+    assert not grid.has_lost
+    assert grid.clicks == 2 + len(mines)
+
+    histograms = app.tracer.histograms
+    assert set(histograms) == {'reveal', 'flag', 'chord'}
+    assert histograms['reveal'].count == 1
+    assert histograms['flag'].count == len(mines)
+    assert histograms['chord'].count == 1
+
+
+def test_play_survives_every_tile_being_flagged(app):
+    grid = app.grid
+    latency.click(app, latency.tile_pos(grid, grid.grid[10][10]), 1)
+    for tile in (tile for row in grid.grid for tile in row):
+        if not tile.is_revealed:
+            tile.flag()
+
+    latency.play(app, 5, random.Random(0))
+    assert app.tracer.histograms['flag'].count >= 1
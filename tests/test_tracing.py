@@ -0,0 +1,43 @@
+import tracing
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_click_is_traced_from_the_previous_poll():
+    clock = FakeClock()
+    tracer = tracing.Tracer(clock)
+
+    tracer.poll()
+    clock.now = 0.016
+    tracer.poll()
+    tracer.receive('up')
+    clock.now = 0.017
+    tracer.mark('handled')
+    clock.now = 0.018
+    tracer.act('reveal')
+    clock.now = 0.020
+    tracer.present()
+
+    histogram = tracer.histograms['reveal']
+    assert histogram.count == 1
+    assert round(histogram.worst, 6) == 20
+    stages = tracer.stage_histograms['reveal']
+    assert round(stages['queued -> received'].worst, 6) == 16
+    assert round(stages['acted -> presented'].worst, 6) == 2
+
+
+def test_inputs_without_an_action_are_not_recorded():
+    clock = FakeClock()
+    tracer = tracing.Tracer(clock)
+
+    tracer.poll()
+    tracer.receive('down')
+    tracer.mark('handled')
+    tracer.present()
+    assert tracer.histograms == {}
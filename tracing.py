@@ -0,0 +1,130 @@
+import time
+
+# The stages every traced click goes through, in order
+STAGES = ['queued', 'received', 'handled', 'acted', 'presented']
+
+
+class LatencyHistogram:
+    """
+    Latencies (in ms) counted into fixed width buckets, so any number of samples takes the same memory.
+    """
+
+    def __init__(self, bucket_ms=0.1):
+        self.bucket_ms = bucket_ms
+        self.buckets = {}
+        self.count = 0
+        self.total = 0
+        self.worst = 0
+
+    def add(self, latency):
+        bucket = int(latency / self.bucket_ms)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += latency
+        self.worst = max(self.worst, latency)
+
+    @property
+    def mean(self):
+        if self.count == 0:
+            return 0.0
+        return self.total / self.count
+
+    def percentile(self, percent):
+        """Latency below which the given percent of samples fall, accurate to bucket_ms."""
+
+        if self.count == 0:
+            return None
+
+        target = self.count * percent / 100
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= target:
+                # The top of the bucket, but never more than the slowest sample actually seen
+                return min((bucket + 1) * self.bucket_ms, self.worst)
+        return None
+
+    def summary(self):
+        return (
+            f"n={self.count} mean={self.mean:.2f}ms p50={self.percentile(50):.2f}ms "
+            f"p95={self.percentile(95):.2f}ms max={self.worst:.2f}ms"
+        )
+
+
+class Tracer:
+    """
+    Follows each click from when it arrived on the event queue, through the grid handling it and the action it
+    causes, to the display update that shows the result.
+    pygame doesn't say when an event arrived, only that it came after the previous time the queue was read,
+    so that is used as its arrival. This makes the queue wait (mostly the clock sleeping between frames) and
+    the total latency worst case figures.
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.current = None
+        self.pending = []
+
+        # When the event queue was last read, and the time before that
+        self.last_poll = None
+        self.previous_poll = None
+
+        # Input to display latency for each action, and how long each stage took for each action
+        self.histograms = {}
+        self.stage_histograms = {}
+
+    def poll(self):
+        """Called straight after the event queue is read."""
+
+        self.previous_poll = self.last_poll
+        self.last_poll = self.clock()
+
+    def receive(self, event_type):
+        """Start a new trace for an input event read in the latest poll."""
+
+        received = self.clock()
+        queued = self.previous_poll if self.previous_poll is not None else received
+        self.current = {'event': event_type, 'queued': queued, 'received': received}
+
+    def mark(self, stage):
+        if self.current is not None and stage not in self.current:
+            self.current[stage] = self.clock()
+
+    def act(self, action):
+        """The traced input caused an action, so it is waiting to be displayed."""
+
+        if self.current is None:
+            return
+        self.mark('handled')
+        self.current['acted'] = self.clock()
+        self.current['action'] = action
+        self.pending.append(self.current)
+        self.current = None
+
+    def present(self):
+        """Called straight after the display is updated, completing every trace waiting on it."""
+
+        if not self.pending:
+            return
+
+        presented = self.clock()
+        for trace in self.pending:
+            trace['presented'] = presented
+            action = trace['action']
+
+            total = (presented - trace['queued']) * 1000
+            self.histograms.setdefault(action, LatencyHistogram()).add(total)
+
+            stages = self.stage_histograms.setdefault(action, {})
+            for start, end in zip(STAGES, STAGES[1:]):
+                latency = (trace[end] - trace[start]) * 1000
+                stages.setdefault(f"{start} -> {end}", LatencyHistogram()).add(latency)
+        self.pending = []
+
+    def report(self):
+        lines = []
+        for action in sorted(self.histograms):
+            lines.append(f"{action}: {self.histograms[action].summary()}")
+            for stage, histogram in self.stage_histograms[action].items():
+                lines.append(f"    {stage}: {histogram.summary()}")
+        return "\n".join(lines)